@@ -1,26 +1,40 @@
 from langgraph.graph import StateGraph, START, END
 from typing import TypedDict, Annotated
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage 
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode, tools_condition 
+from langgraph.prebuilt import tools_condition
 from langchain_core.tools import tool, BaseTool
-from langchain_mcp_adapters.client import MultiServerMCPClient
 from dotenv import load_dotenv
-from langchain_cerebras import ChatCerebras
-from langchain_groq import ChatGroq
-from langsmith import traceable  # ← ADDED
-import aiosqlite
-import requests
+from llm_cache import SemanticLLMCache
+from storage import DB_PATH, get_checkpointer
+from mcp_client import get_tools_cached
 import asyncio
+import functools
+import hashlib
+import json
 import threading
 import os
 
 load_dotenv()
+
+# LangSmith tracing only when enabled; otherwise chat_node is left undecorated
+TRACING = any(
+    os.getenv(var, "").lower() == "true"
+    for var in ("LANGCHAIN_TRACING_V2", "LANGSMITH_TRACING")
+)
+if TRACING:
+    from langsmith import traceable as traceable_opt
+else:
+    def traceable_opt(**kwargs):
+        return lambda f: f
  
 
-# Dedicated async loop for backend tasks
-_ASYNC_LOOP = asyncio.new_event_loop()
+# Dedicated async loop for backend tasks (uvloop where available)
+try:
+    import uvloop
+    _ASYNC_LOOP = uvloop.new_event_loop()
+except ImportError:
+    _ASYNC_LOOP = asyncio.new_event_loop()
 _ASYNC_THREAD = threading.Thread(target=_ASYNC_LOOP.run_forever, daemon=True)
 _ASYNC_THREAD.start()
 
@@ -41,7 +55,15 @@ def submit_async_task(coro):
 # -------------------
 # 1. LLM
 # ------------------- 
-llm = ChatGroq(model="meta-llama/llama-4-scout-17b-16e-instruct")  
+@functools.cache
+def _get_llm():
+    # Imported lazily: provider SDKs are slow to import on cold start
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        model="meta-llama/llama-4-scout-17b-16e-instruct",
+        cache=SemanticLLMCache(DB_PATH),
+    )
 
 
 # -------------------
@@ -55,24 +77,14 @@ def get_siam_fav_number()->int:
 CLICKUP_API_KEY = os.getenv("CLICKUP_API_KEY")
 CLICKUP_TEAM_ID = os.getenv("CLICKUP_TEAM_ID")
 
-client = MultiServerMCPClient(
-    { 
-    "clickup": {
-      "transport": "stdio",
-      "command": "npx",
-      "args": ["-y", "mcp-remote", "https://mcp.clickup.com/mcp"]
-    }
-  }
-)
-
 
 def load_mcp_tools() -> list[BaseTool]:
     try:
         print("🔄 Attempting to load MCP tools...")
-        tools = run_async(client.get_tools())
+        tools = run_async(get_tools_cached())
         print(f"✅ Successfully loaded {len(tools)} MCP tools")
-        for tool in tools:
-            print(f"  - {tool.name}")
+        for t in tools:
+            print(f"  - {t.name}")
         return tools
     except Exception as e:
         print(f"❌ Failed to load MCP tools: {type(e).__name__}: {e}")
@@ -83,13 +95,21 @@ def load_mcp_tools() -> list[BaseTool]:
 
 mcp_tools = load_mcp_tools()
  
+# Keep the tool schema order stable across restarts so the provider can
+# reuse its prompt cache for the (system prompt + tools) prefix
+mcp_tools = sorted(mcp_tools, key=lambda t: t.name)
+MCP_TOOL_INDEX = {t.name: t for t in mcp_tools}
+
+
 # Bind tools to LLM
-if mcp_tools:
-    print(f"🔧 Binding {len(mcp_tools)} tools to LLM")
-    llm_with_tools = llm.bind_tools(mcp_tools)
-else:
+@functools.cache
+def _get_llm_with_tools():
+    if mcp_tools:
+        print(f"🔧 Binding {len(mcp_tools)} tools to LLM")
+        return _get_llm().bind_tools(mcp_tools)
     print("⚠️  No tools to bind - LLM will run without tools")
-    llm_with_tools = llm 
+    return _get_llm()
+
     
 # -------------------
 # 3. State
@@ -100,37 +120,122 @@ class ChatState(TypedDict):
 # -------------------
 # 4. Nodes
 # -------------------
-@traceable(name="chat_node", run_type="llm")  # ← ADDED: Trace LLM calls
+# Static prefix sent first on every call. It must not change between turns,
+# otherwise the provider's prompt cache is invalidated.
+SYSTEM_PROMPT = SystemMessage(
+    content="You are a helpful AI assistant with access to ClickUp tools. "
+            "You can help users manage their tasks, projects, and workflows in ClickUp. "
+            "You can use the tools as many times as needed to provide effective assistance."
+)
+
+
+HISTORY_LIMIT = 20   # longer histories get their older part summarized
+HISTORY_WINDOW = 16  # most recent messages always sent verbatim
+HISTORY_STEP = HISTORY_WINDOW // 2  # the window start only moves in these steps
+_SUMMARY_CACHE_SIZE = 128
+_summary_cache: dict[str, str] = {}  # prefix hash -> summary of that prefix
+
+
+def _window_start(messages: list[BaseMessage]) -> int:
+    # Round down so the summarized prefix (and its cached summary) stays the
+    # same for several turns instead of changing on every call
+    start = max(len(messages) - HISTORY_WINDOW, 0) // HISTORY_STEP * HISTORY_STEP
+    # Never separate tool results from the AI message that requested them
+    while start > 0 and isinstance(messages[start], ToolMessage):
+        start -= 1
+    return start
+
+
+def _prefix_hashes(messages: list[BaseMessage]) -> list[str]:
+    """Chained hashes where entry i identifies messages[:i + 1]."""
+    hashes, digest = [], ""
+    for m in messages:
+        payload = json.dumps([digest, m.type, m.content, getattr(m, "tool_calls", None)], default=str)
+        digest = hashlib.sha256(payload.encode()).hexdigest()
+        hashes.append(digest)
+    return hashes
+
+
+async def _summarize(messages: list[BaseMessage]) -> SystemMessage:
+    """Summary of the messages before the window, updated incrementally.
+
+    The longest already-summarized prefix is reused, so only the messages
+    dropped since then are sent to the summarizer.
+    """
+    hashes = _prefix_hashes(messages)
+    done = next((i + 1 for i in range(len(hashes) - 1, -1, -1) if hashes[i] in _summary_cache), 0)
+    if done < len(messages):
+        new_part = "\n".join(f"{m.type}: {m.content}" for m in messages[done:])
+        previous = _summary_cache[hashes[done - 1]] if done else ""
+        # Tagged so stream_mode="messages" consumers don't get the summary as the reply
+        summary = await _get_llm().with_config(tags=["nostream"]).ainvoke([
+            SystemMessage(
+                content="Summarize this conversation between a user and a ClickUp assistant. "
+                        "Keep task names, ids, decisions and open questions. "
+                        "If a previous summary is given, extend it with the new messages."
+            ),
+            HumanMessage(
+                content=f"Previous summary:\n{previous}\n\nNew messages:\n{new_part}"
+                if previous else new_part
+            ),
+        ])
+        if len(_summary_cache) >= _SUMMARY_CACHE_SIZE:
+            _summary_cache.pop(next(iter(_summary_cache)))
+        _summary_cache[hashes[-1]] = summary.content
+    return SystemMessage(
+        content=f"Summary of the earlier conversation:\n{_summary_cache[hashes[-1]]}"
+    )
+
+
+@traceable_opt(name="chat_node", run_type="llm")  # Traces LLM calls when tracing is on
 async def chat_node(state: ChatState):
     """LLM node that may answer or request a tool call."""
-    messages = state["messages"]
-
-    # Add system prompt if this is the first message
-    if not any(isinstance(msg, SystemMessage) for msg in messages):
-        system_prompt = SystemMessage(
-            content="You are a helpful AI assistant with access to ClickUp tools. "
-                    "You can help users manage their tasks, projects, and workflows in ClickUp. "
-                    "You can use the tools as many times as needed to provide effective assistance."
-        )
-        messages = [system_prompt] + messages
+    history = state["messages"]
+    messages = history
+
+    # Bound the prompt: summarize everything before the recent window
+    if len(history) > HISTORY_LIMIT:
+        start = _window_start(history)
+        if start > 0:
+            messages = [await _summarize(history[:start])] + history[start:]
 
-    response = await llm_with_tools.ainvoke(messages)
+    # Static system prompt first, dynamic conversation after it
+    if not any(isinstance(msg, SystemMessage) for msg in history):
+        messages = [SYSTEM_PROMPT] + messages
+
+    response = await _get_llm_with_tools().ainvoke(messages)
     return {"messages": [response]}
 
 
-tool_node = ToolNode(mcp_tools) if mcp_tools else None
+TOOL_TIMEOUT = 30  # seconds per MCP tool call
 
-# -------------------
-# 5. Checkpointer
-# -------------------
 
+async def _invoke_tool(tool_call) -> ToolMessage:
+    mcp_tool = MCP_TOOL_INDEX.get(tool_call["name"])
+    try:
+        if mcp_tool is None:
+            raise ValueError(f"Unknown tool: {tool_call['name']}")
+        return await asyncio.wait_for(mcp_tool.ainvoke(tool_call), timeout=TOOL_TIMEOUT)
+    except Exception as e:
+        # Report the failure to the LLM like ToolNode does instead of failing the turn
+        return ToolMessage(
+            content=f"Error: {type(e).__name__}: {e}",
+            tool_call_id=tool_call["id"],
+            name=tool_call["name"],
+            status="error",
+        )
 
-async def _init_checkpointer():
-    conn = await aiosqlite.connect(database="chatbot.db")
-    return AsyncSqliteSaver(conn)
 
+async def tool_node(state: ChatState):
+    """Run every tool call from the last AI message concurrently."""
+    tool_calls = state["messages"][-1].tool_calls
+    results = await asyncio.gather(*(_invoke_tool(tc) for tc in tool_calls))
+    return {"messages": list(results)}
 
-checkpointer = run_async(_init_checkpointer())
+# -------------------
+# 5. Checkpointer
+# -------------------
+checkpointer = run_async(get_checkpointer())
 
 # -------------------
 # 6. Graph
@@ -139,7 +244,7 @@ graph = StateGraph(ChatState)
 graph.add_node("chat_node", chat_node)
 graph.add_edge(START, "chat_node")
 
-if tool_node:
+if mcp_tools:
     graph.add_node("tools", tool_node)
     graph.add_conditional_edges("chat_node", tools_condition)
     graph.add_edge("tools", "chat_node")
@@ -152,10 +257,7 @@ chatbot = graph.compile(checkpointer=checkpointer)
 # 7. Helper
 # -------------------
 async def _alist_threads():
-    all_threads = set()
-    async for checkpoint in checkpointer.alist(None):
-        all_threads.add(checkpoint.config["configurable"]["thread_id"])
-    return list(all_threads)
+    return await checkpointer.alist_thread_ids()
 
 
 def retrieve_all_threads():
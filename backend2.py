@@ -1,10 +1,9 @@
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.prebuilt import create_react_agent  # ← Use this instead
 from langchain_core.tools import tool, BaseTool
-from langchain_mcp_adapters.client import MultiServerMCPClient
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
-import aiosqlite
+from storage import close_checkpointer, get_checkpointer
+from mcp_client import get_tools_cached
 import asyncio
 import os
 
@@ -21,18 +20,10 @@ llm = ChatGroq(model="meta-llama/llama-4-scout-17b-16e-instruct")
 CLICKUP_API_KEY = os.getenv("CLICKUP_API_KEY")
 CLICKUP_TEAM_ID = os.getenv("CLICKUP_TEAM_ID")
 
-client = MultiServerMCPClient({
-    "clickup": {
-        "transport": "stdio",
-        "command": "npx",
-        "args": ["-y", "mcp-remote", "https://mcp.clickup.com/mcp"]
-    }
-})
-
 async def load_mcp_tools() -> list[BaseTool]:
     try:
         print("🔄 Attempting to load MCP tools...")
-        tools = await client.get_tools()
+        tools = await get_tools_cached()
         print(f"✅ Successfully loaded {len(tools)} MCP tools")
         for tool in tools:
             print(f"  - {tool.name}")
@@ -44,30 +35,30 @@ async def load_mcp_tools() -> list[BaseTool]:
         return []
 
 # -------------------
-# 3. Checkpointer
+# 3. Agent (using create_react_agent)
 # -------------------
-async def init_checkpointer():
-    conn = await aiosqlite.connect(database="chatbot.db")
-    return AsyncSqliteSaver(conn)
+_CHATBOT = None
+_CHATBOT_LOCK = asyncio.Lock()
 
-# -------------------
-# 4. Agent (using create_react_agent)
-# -------------------
 async def create_chatbot():
-    mcp_tools = await load_mcp_tools()
-    checkpointer = await init_checkpointer()
-    
-    # Use create_react_agent which properly handles async tools
-    chatbot = create_react_agent(
-        llm, 
-        mcp_tools, 
-        checkpointer=checkpointer
-    )
+    """Build the agent on first use and reuse the compiled graph afterwards."""
+    global _CHATBOT
+    async with _CHATBOT_LOCK:
+        if _CHATBOT is None:
+            mcp_tools = await load_mcp_tools()
+            checkpointer = await get_checkpointer()
+            
+            # Use create_react_agent which properly handles async tools
+            _CHATBOT = create_react_agent(
+                llm, 
+                mcp_tools, 
+                checkpointer=checkpointer
+            )
     
-    return chatbot
+    return _CHATBOT
 
 # -------------------
-# 5. Chat function
+# 4. Chat function
 # -------------------
 async def chat(user_message: str, thread_id: str = "default"):
     chatbot = await create_chatbot()
@@ -95,24 +86,25 @@ async def chat(user_message: str, thread_id: str = "default"):
             print(f"🤖 Assistant: {last_message.content}\n")
 
 # -------------------
-# 6. Helper functions
+# 5. Helper functions
 # -------------------
 async def retrieve_all_threads():
-    checkpointer = await init_checkpointer()
-    all_threads = set()
-    async for checkpoint in checkpointer.alist(None):
-        all_threads.add(checkpoint.config["configurable"]["thread_id"])
-    return list(all_threads)
+    checkpointer = await get_checkpointer()
+    return await checkpointer.alist_thread_ids()
 
 # -------------------
-# 7. Main execution
+# 6. Main execution
 # -------------------
 async def main():
-    # Test the chatbot
-    await chat("can u check my task? what is the update?")
-    
-    # You can continue the conversation
-    # await chat("what about my other tasks?", thread_id="default")
+    try:
+        # Test the chatbot
+        await chat("can u check my task? what is the update?")
+        
+        # You can continue the conversation
+        # await chat("what about my other tasks?", thread_id="default")
+    finally:
+        # asyncio.run() cancels the batch writer on exit, so flush it first
+        await close_checkpointer()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
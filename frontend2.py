@@ -1,13 +1,21 @@
 import streamlit as st
 import asyncio
+import hashlib
+import json
+import queue
+import threading
+import time
+import traceback
 from datetime import datetime
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langchain.agents import create_agent  # Updated import
+from langchain_core.messages import AIMessageChunk, HumanMessage
 from langchain_core.tools import BaseTool
-from langchain_mcp_adapters.client import MultiServerMCPClient
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
-import aiosqlite
+from llm_cache import SemanticLLMCache
+from plan_cache import PlanCache, PlanReplayError, replay_plan
+from storage import DB_PATH, get_checkpointer
+from mcp_client import get_tools_cached
 import os
 import atexit
 
@@ -50,82 +58,67 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # -------------------
-# Global MCP Client Manager
+# Backend event loop
 # -------------------
-class MCPClientManager:
-    _instance = None
-    _client = None
-    _tools = None
-    _lock = asyncio.Lock()
-    
-    @classmethod
-    def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = cls()
-        return cls._instance
-    
-    async def get_client(self):
-        async with self._lock:
-            if self._client is None:
-                self._client = MultiServerMCPClient({
-                    "clickup": {
-                        "transport": "stdio",
-                        "command": "npx",
-                        "args": ["-y", "mcp-remote", "https://mcp.clickup.com/mcp"]
-                    }
-                })
-            return self._client
-    
-    async def get_tools(self):
-        async with self._lock:
-            if self._tools is None:
-                client = await self.get_client()
-                try:
-                    self._tools = await client.get_tools()
-                except Exception as e:
-                    st.error(f"❌ Failed to load MCP tools: {e}")
-                    self._tools = []
-            return self._tools
-    
-    async def cleanup(self):
-        async with self._lock:
-            if self._client is not None:
-                try:
-                    await self._client.close()
-                except:
-                    pass
-                self._client = None
-                self._tools = None
+@st.cache_resource
+def get_async_loop():
+    """Dedicated loop that outlives reruns, keeping MCP and SQLite state warm"""
+    try:
+        import uvloop
+        loop = uvloop.new_event_loop()
+    except ImportError:
+        loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+def submit_async_task(coro):
+    """Schedule a coroutine on the backend event loop."""
+    return asyncio.run_coroutine_threadsafe(coro, get_async_loop())
+
+
+def run_async(coro):
+    return submit_async_task(coro).result()
 
 # -------------------
-# LLM Setup
+# MCP Tools
 # -------------------
-@st.cache_resource
-def get_llm():
-    return ChatGroq(model="meta-llama/llama-4-scout-17b-16e-instruct")
+async def get_mcp_tools():
+    """Shared MCP tools, or an empty list if the server can't be reached"""
+    try:
+        return await get_tools_cached()
+    except Exception as e:
+        print(f"❌ Failed to load MCP tools: {type(e).__name__}: {e}")
+        return []
 
 # -------------------
-# Checkpointer with caching
+# LLM Setup
 # -------------------
-_checkpointer_cache = {}
+@st.cache_resource
+def get_llm_cache():
+    """Response cache shared by every session of this process"""
+    return SemanticLLMCache(DB_PATH)
 
-async def get_checkpointer():
-    """Initialize SQLite checkpointer for conversation history"""
-    if "checkpointer" not in _checkpointer_cache:
-        conn = await aiosqlite.connect(database="chatbot.db")
-        _checkpointer_cache["checkpointer"] = AsyncSqliteSaver(conn)
-    return _checkpointer_cache["checkpointer"]
+
+@st.cache_resource
+def get_llm():
+    return ChatGroq(
+        model="meta-llama/llama-4-scout-17b-16e-instruct",
+        cache=get_llm_cache(),
+    )
+
+@st.cache_resource
+def get_plan_cache():
+    """Tool-call plans shared by every session of this process"""
+    return PlanCache(DB_PATH)
 
 # -------------------
 # Agent Creation with proper async handling
 # -------------------
-async def create_chatbot():
+async def create_chatbot(llm):
     """Create the agent with MCP tools"""
-    llm = get_llm()
-    
-    # Get tools from the singleton manager
-    manager = MCPClientManager.get_instance()
-    mcp_tools = await manager.get_tools()
+    # Get tools from the process-wide MCP client
+    mcp_tools = await get_mcp_tools()
     
     checkpointer = await get_checkpointer()
     
@@ -139,84 +132,185 @@ async def create_chatbot():
     
     return chatbot, len(mcp_tools)
 
+
+@st.cache_resource
+def get_chatbot():
+    """Compile the agent once per process and reuse it across reruns"""
+    return run_async(create_chatbot(get_llm()))
+
 # -------------------
 # Chat Logic
 # -------------------
-async def process_message(user_message: str, thread_id: str):
-    """Process a user message and stream the response"""
-    chatbot, num_tools = await create_chatbot()
-    
+# Minimum seconds between streamed response redraws
+STREAM_INTERVAL = 0.05
+
+
+def _tool_info(tool_call: dict) -> dict:
+    """Display record for a tool call, with its args serialized once"""
+    args = tool_call.get('args', {})
+    return {
+        "name": tool_call.get('name', 'unknown'),
+        "args": args,
+        # Rendered with st.code on every redraw instead of rebuilding st.json
+        "args_json": json.dumps(args, indent=2, default=str),
+    }
+
+
+def _tool_call_fingerprint(tool_info: dict) -> str:
+    """Short hash identifying a tool call by name and arguments"""
+    key = f"{tool_info['name']}|{json.dumps(tool_info['args'], sort_keys=True, default=str)}"
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+async def _record_turn(chatbot, config, user_turn, new_messages, events: queue.Queue):
+    """Write a replayed turn to the thread as if the agent had produced it"""
+    await chatbot.aupdate_state(
+        config, {"messages": [user_turn] + new_messages}, as_node="agent"
+    )
+    tool_calls_made = [
+        _tool_info(tool_call)
+        for message in new_messages
+        for tool_call in getattr(message, "tool_calls", None) or []
+    ]
+    events.put(("tool_calls", tool_calls_made))
+
+
+async def _run_agent(chatbot, llm, plan_cache: PlanCache, user_message: str, thread_id: str, events: queue.Queue):
+    """Run one turn on the backend loop, pushing UI updates onto events"""
     config = {"configurable": {"thread_id": thread_id}}
     
     full_response = ""
     tool_calls_made = []
-    
-    # Create placeholders for streaming
-    response_placeholder = st.empty()
-    tool_placeholder = st.empty()
+    seen_fp: set[str] = set()
     
     try:
-        async for event in chatbot.astream(
+        # Replay a cached tool plan for similar goals, skipping the ReAct loop
+        plan = await asyncio.to_thread(plan_cache.lookup, user_message)
+        if plan:
+            user_turn = HumanMessage(content=user_message)
+            try:
+                mcp_tools = await get_mcp_tools()
+                state = await chatbot.aget_state(config)
+                new_messages = await replay_plan(
+                    llm,
+                    mcp_tools,
+                    plan,
+                    state.values.get("messages", []) + [user_turn],
+                )
+            except PlanReplayError as e:
+                # Tools already ran, so re-running the turn could repeat their
+                # side effects: keep what happened and report the error instead
+                await _record_turn(chatbot, config, user_turn, e.messages, events)
+                raise
+            except Exception as e:
+                # Nothing ran yet, the full agent can safely take over
+                print(f"⚠️  Plan replay failed, falling back to agent: {type(e).__name__}: {e}")
+            else:
+                await _record_turn(chatbot, config, user_turn, new_messages, events)
+                events.put(("response", new_messages[-1].content))
+                return
+        
+        # "messages" yields token deltas, "values" the full state after each step
+        partial, partial_id, last_flush = "", None, 0.0
+        async for mode, payload in chatbot.astream(
             {"messages": [("user", user_message)]},
             config=config,
-            stream_mode="values"
+            stream_mode=["messages", "values"]
         ):
-            last_message = event["messages"][-1]
+            if mode == "messages":
+                chunk, _ = payload
+                if isinstance(chunk, AIMessageChunk) and isinstance(chunk.content, str):
+                    if chunk.id != partial_id:
+                        partial, partial_id = "", chunk.id
+                    partial += chunk.content
+                    # Time-gate placeholder updates to avoid rerender storms
+                    now = time.monotonic()
+                    if partial and now - last_flush >= STREAM_INTERVAL:
+                        events.put(("response", partial))
+                        last_flush = now
+                continue
+            
+            last_message = payload["messages"][-1]
             
             # Track tool calls
             if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
+                changed = False
                 for tool_call in last_message.tool_calls:
-                    tool_info = {
-                        "name": tool_call.get('name', 'unknown'),
-                        "args": tool_call.get('args', {})
-                    }
-                    if tool_info not in tool_calls_made:
+                    tool_info = _tool_info(tool_call)
+                    fp = _tool_call_fingerprint(tool_info)
+                    if fp not in seen_fp:
+                        seen_fp.add(fp)
                         tool_calls_made.append(tool_info)
-            
-            # Update tool calls display
-            if tool_calls_made:
-                with tool_placeholder:
-                    with st.expander("🔧 Tool Calls", expanded=True):
-                        for tc in tool_calls_made:
-                            st.markdown(f"**{tc['name']}**")
-                            if tc['args']:
-                                st.json(tc['args'])
+                        changed = True
+                
+                # Update tool calls display only when a new call shows up
+                if changed:
+                    events.put(("tool_calls", list(tool_calls_made)))
             
             # Stream assistant response
             if last_message.type == "ai" and last_message.content:
                 full_response = last_message.content
-                response_placeholder.markdown(full_response)
-        
-        return full_response, tool_calls_made
+                events.put(("response", full_response))
         
+        if full_response and tool_calls_made:
+            await asyncio.to_thread(plan_cache.store, user_message, tool_calls_made)
     except Exception as e:
-        st.error(f"❌ Error processing message: {e}")
-        import traceback
-        st.code(traceback.format_exc())
-        return None, []
+        events.put(("error", e))
+    finally:
+        events.put(None)
+
+
+def process_message(chatbot, user_message: str, thread_id: str):
+    """Process a user message and stream the response"""
+    full_response = ""
+    tool_calls_made = []
+    
+    # Create placeholders for streaming
+    response_placeholder = st.empty()
+    tool_placeholder = st.empty()
+    
+    # The agent runs on the backend loop; Streamlit calls must stay on this thread
+    events: queue.Queue = queue.Queue()
+    submit_async_task(
+        _run_agent(chatbot, get_llm(), get_plan_cache(), user_message, thread_id, events)
+    )
+    
+    while (item := events.get()) is not None:
+        kind, payload = item
+        
+        if kind == "error":
+            st.error(f"❌ Error processing message: {payload}")
+            st.code("".join(traceback.format_exception(payload)))
+            return None, []
+        
+        if kind == "tool_calls":
+            tool_calls_made = payload
+            with tool_placeholder:
+                with st.expander("🔧 Tool Calls", expanded=True):
+                    for tc in tool_calls_made:
+                        st.markdown(f"**{tc['name']}**")
+                        if tc['args']:
+                            st.code(tc['args_json'], language="json")
+        elif kind == "response":
+            full_response = payload
+            response_placeholder.markdown(full_response)
+    
+    return full_response, tool_calls_made
 
 # -------------------
 # Retrieve Threads
 # -------------------
 async def get_all_threads():
     """Get all conversation threads from the database"""
-    try:
-        checkpointer = await get_checkpointer()
-        all_threads = set()
-        async for checkpoint in checkpointer.alist(None):
-            all_threads.add(checkpoint.config["configurable"]["thread_id"])
-        return sorted(list(all_threads))
-    except Exception as e:
-        st.error(f"Error retrieving threads: {e}")
-        return []
+    checkpointer = await get_checkpointer()
+    return await checkpointer.alist_thread_ids()
 
 # -------------------
 # Initialize tools on startup
 # -------------------
 async def init_tools():
     """Initialize MCP tools"""
-    manager = MCPClientManager.get_instance()
-    tools = await manager.get_tools()
+    tools = await get_mcp_tools()
     return len(tools)
 
 # -------------------
@@ -254,7 +348,11 @@ with st.sidebar:
     # Load existing threads button
     if st.button("🔄 Load Threads"):
         with st.spinner("Loading threads..."):
-            threads = asyncio.run(get_all_threads())
+            try:
+                threads = run_async(get_all_threads())
+            except Exception as e:
+                st.error(f"Error retrieving threads: {e}")
+                threads = []
             st.session_state.available_threads = threads
     
     # Thread selector
@@ -276,18 +374,22 @@ with st.sidebar:
     
     # Tools status
     st.subheader("🔧 Tools Status")
-    if not st.session_state.tools_loaded:
+    # Only block on the loader before the first message; afterwards the
+    # cached agent already holds the tools
+    if not st.session_state.tools_loaded and not st.session_state.get("messages"):
         with st.spinner("Loading MCP tools..."):
             try:
-                num_tools = asyncio.run(init_tools())
+                num_tools = run_async(init_tools())
                 st.session_state.num_tools = num_tools
                 st.session_state.tools_loaded = True
                 st.success(f"✅ {num_tools} tools loaded")
             except Exception as e:
                 st.error(f"❌ Failed to load tools")
                 st.exception(e)
-    else:
+    elif st.session_state.tools_loaded:
         st.success(f"✅ {st.session_state.num_tools} tools ready")
+    else:
+        st.warning("⚠️ MCP tools not loaded")
     
     st.markdown("---")
     
@@ -316,7 +418,7 @@ for message in st.session_state.messages:
                 for tc in message["tool_calls"]:
                     st.markdown(f"**{tc['name']}**")
                     if tc.get('args'):
-                        st.json(tc['args'])
+                        st.code(tc['args_json'], language="json")
 
 # Chat input
 if prompt := st.chat_input("Ask about your ClickUp tasks..."):
@@ -329,8 +431,9 @@ if prompt := st.chat_input("Ask about your ClickUp tasks..."):
     # Generate assistant response
     with st.chat_message("assistant"):
         with st.spinner("🤔 Thinking..."):
-            response, tool_calls = asyncio.run(
-                process_message(prompt, st.session_state.thread_id)
+            chatbot, _ = get_chatbot()
+            response, tool_calls = process_message(
+                chatbot, prompt, st.session_state.thread_id
             )
         
         if response:
@@ -340,7 +443,7 @@ if prompt := st.chat_input("Ask about your ClickUp tasks..."):
                 "content": response,
                 "tool_calls": tool_calls
             })
-            st.rerun()
+            # No st.rerun(): the reply is already rendered in place by process_message
 
 # -------------------
 # Welcome Message
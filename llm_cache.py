@@ -0,0 +1,223 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _normalize_prompt(prompt: str) -> tuple[str, Optional[str]]:
+    """Return a stable cache key for a serialized message list.
+
+    Message ids are random per run, so they are dropped before hashing.
+    Also returns the user text when the prompt is a single user turn
+    (plus system messages), which is the only case where a semantic match
+    is safe to reuse.
+    """
+    try:
+        payload = json.loads(prompt)
+    except ValueError:
+        return _sha256(prompt), None
+    if not isinstance(payload, list):
+        return _sha256(prompt), None
+
+    turns = []
+    for message in payload:
+        kwargs = message.get("kwargs", {}) if isinstance(message, dict) else {}
+        kwargs.pop("id", None)
+        kind = message.get("id", [""])[-1] if isinstance(message, dict) else ""
+        if kind != "SystemMessage":
+            turns.append((kind, kwargs.get("content")))
+
+    user_text = None
+    if len(turns) == 1 and turns[0][0] == "HumanMessage" and isinstance(turns[0][1], str):
+        user_text = turns[0][1]
+    return _sha256(json.dumps(payload, sort_keys=True)), user_text
+
+
+def _has_tool_calls(generations) -> bool:
+    # A tool call's arguments are specific to the request that produced it
+    # ("list Marketing" vs "list Engineering"), so it must never be reused
+    # for a merely similar prompt
+    return any(
+        getattr(getattr(g, "message", None), "tool_calls", None) for g in generations
+    )
+
+
+def _semantic_text(user_text: Optional[str], max_chars: int) -> Optional[str]:
+    # Long inputs (e.g. transcripts to summarize) can embed close together while
+    # needing different answers, so only short queries get semantic matches
+    if user_text is None or len(user_text) > max_chars:
+        return None
+    return user_text
+
+
+class SemanticLLMCache(BaseCache):
+    """LLM response cache stored in the chatbot SQLite database.
+
+    Lookups first try an exact SHA-256 match on the serialized messages.
+    On a miss, if the prompt is a single user turn of at most
+    ``max_semantic_chars`` and ``fastembed`` is installed, the most similar
+    cached user turn is reused when its cosine similarity is at least
+    ``threshold``. Responses that call tools are only ever matched exactly.
+    """
+
+    def __init__(
+        self,
+        database: str = "chatbot.db",
+        threshold: float = 0.92,
+        model_name: str = "BAAI/bge-small-en-v1.5",
+        max_semantic_chars: int = 500,
+    ):
+        self.threshold = threshold
+        self.max_semantic_chars = max_semantic_chars
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(database, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                prompt_hash TEXT NOT NULL,
+                llm_hash TEXT NOT NULL,
+                embedding BLOB,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (prompt_hash, llm_hash)
+            )
+            """
+        )
+        self._conn.commit()
+        self._embedder = None
+        # llm_hash -> (prompt hashes, normalized embedding matrix)
+        self._vectors: dict[str, tuple[list[str], Any]] = {}
+
+    # -------------------
+    # Embeddings
+    # -------------------
+    def _get_embedder(self):
+        if self._embedder is None:
+            try:
+                from fastembed import TextEmbedding
+            except ImportError:
+                self._embedder = False
+            else:
+                self._embedder = TextEmbedding(model_name=self.model_name)
+        return self._embedder or None
+
+    def _embed(self, text: str):
+        embedder = self._get_embedder()
+        if embedder is None:
+            return None
+        import numpy as np
+
+        vector = np.asarray(next(iter(embedder.embed([text]))), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _load_vectors(self, llm_hash: str):
+        if llm_hash not in self._vectors:
+            import numpy as np
+
+            rows = self._conn.execute(
+                "SELECT prompt_hash, embedding FROM llm_cache "
+                "WHERE llm_hash = ? AND embedding IS NOT NULL",
+                (llm_hash,),
+            ).fetchall()
+            keys = [row[0] for row in rows]
+            matrix = (
+                np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+                if rows
+                else None
+            )
+            self._vectors[llm_hash] = (keys, matrix)
+        return self._vectors[llm_hash]
+
+    # -------------------
+    # BaseCache interface
+    # -------------------
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        prompt_hash, user_text = _normalize_prompt(prompt)
+        user_text = _semantic_text(user_text, self.max_semantic_chars)
+        llm_hash = _sha256(llm_string)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_cache WHERE prompt_hash = ? AND llm_hash = ?",
+                (prompt_hash, llm_hash),
+            ).fetchone()
+            if row is not None:
+                return loads(row[0])
+            if user_text is not None:
+                vector = self._embed(user_text)
+                if vector is not None:
+                    keys, matrix = self._load_vectors(llm_hash)
+                    if matrix is not None:
+                        scores = matrix @ vector
+                        best = int(scores.argmax())
+                        if scores[best] >= self.threshold:
+                            row = self._conn.execute(
+                                "SELECT response FROM llm_cache "
+                                "WHERE prompt_hash = ? AND llm_hash = ?",
+                                (keys[best], llm_hash),
+                            ).fetchone()
+        if row is None:
+            return None
+        generations = loads(row[0])
+        # Rows embedded before tool calls were excluded may still carry them
+        if _has_tool_calls(generations):
+            return None
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        prompt_hash, user_text = _normalize_prompt(prompt)
+        user_text = _semantic_text(user_text, self.max_semantic_chars)
+        llm_hash = _sha256(llm_string)
+
+        generations = []
+        for generation in return_val:
+            message = getattr(generation, "message", None)
+            if message is not None and message.id is not None:
+                # Let the model assign a fresh id when the response is reused
+                generation = generation.model_copy(
+                    update={"message": message.model_copy(update={"id": None})}
+                )
+            generations.append(generation)
+
+        if _has_tool_calls(generations):
+            user_text = None
+
+        with self._lock:
+            vector = self._embed(user_text) if user_text is not None else None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(prompt_hash, llm_hash, embedding, response, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    prompt_hash,
+                    llm_hash,
+                    vector.tobytes() if vector is not None else None,
+                    dumps(generations),
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+            if vector is not None and llm_hash in self._vectors:
+                import numpy as np
+
+                keys, matrix = self._vectors[llm_hash]
+                if prompt_hash not in keys:
+                    keys.append(prompt_hash)
+                    matrix = vector[None, :] if matrix is None else np.vstack([matrix, vector])
+                    self._vectors[llm_hash] = (keys, matrix)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._vectors.clear()
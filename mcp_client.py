@@ -0,0 +1,27 @@
+import asyncio
+
+from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.client import MultiServerMCPClient
+
+from tool_cache import load_tools
+
+# One client per process for every entry point (backend, backend2, frontend2)
+CLIENT = MultiServerMCPClient({
+    "clickup": {
+        "transport": "stdio",
+        "command": "npx",
+        "args": ["-y", "mcp-remote", "https://mcp.clickup.com/mcp"]
+    }
+})
+
+_tools: list[BaseTool] | None = None
+_lock = asyncio.Lock()
+
+
+async def get_tools_cached() -> list[BaseTool]:
+    """Load the MCP tools once per process; later calls return the same list."""
+    global _tools
+    async with _lock:
+        if _tools is None:
+            _tools = await load_tools(CLIENT)
+    return _tools
@@ -0,0 +1,157 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.tools import BaseTool
+
+STOPWORDS = frozenset(
+    """
+    a about all am an and any are as at be been but by can could did do does
+    for from get give has have hey hi how i im in is it its let me my of on or
+    our please show so tell than that the their them then there these this to
+    u up us was we what when where which who why will with would you your
+    """.split()
+)
+
+
+def extract_keywords(text: str) -> frozenset[str]:
+    """Content words of a user goal, used as the plan fingerprint."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return frozenset(w for w in words if len(w) > 2 and w not in STOPWORDS)
+
+
+class PlanCache:
+    """Tool-call sequences that answered earlier goals, keyed by keywords.
+
+    A plan is the ordered list of ``{"name", "args"}`` steps taken by the
+    agent, where ``args`` holds only the argument names. Goals match when
+    their keyword sets have a Jaccard similarity of at least
+    ``min_similarity``.
+    """
+
+    def __init__(self, database: str = "chatbot.db", min_similarity: float = 0.75):
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(database, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS plan_cache (
+                fingerprint TEXT PRIMARY KEY,
+                plan TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def lookup(self, user_message: str) -> Optional[list[dict]]:
+        keywords = extract_keywords(user_message)
+        if not keywords:
+            return None
+
+        with self._lock:
+            rows = self._conn.execute("SELECT fingerprint, plan FROM plan_cache").fetchall()
+            best, best_score = None, 0.0
+            for fingerprint, plan in rows:
+                cached = frozenset(fingerprint.split())
+                score = len(keywords & cached) / len(keywords | cached)
+                if score > best_score:
+                    best, best_score = (fingerprint, plan), score
+            if best is None or best_score < self.min_similarity:
+                return None
+            self._conn.execute(
+                "UPDATE plan_cache SET hits = hits + 1 WHERE fingerprint = ?", (best[0],)
+            )
+            self._conn.commit()
+        return json.loads(best[1])
+
+    def store(self, user_message: str, tool_calls: list[dict]) -> None:
+        keywords = extract_keywords(user_message)
+        if not keywords or not tool_calls:
+            return
+
+        plan = [
+            {"name": tc["name"], "args": sorted(tc.get("args") or {})}
+            for tc in tool_calls
+        ]
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plan_cache (fingerprint, plan, hits, updated_at) "
+                "VALUES (?, ?, 0, ?)",
+                (" ".join(sorted(keywords)), json.dumps(plan), time.time()),
+            )
+            self._conn.commit()
+
+
+class PlanReplayError(Exception):
+    """A plan replay that failed after at least one tool started running.
+
+    ``messages`` holds what the replay produced up to the failure, with an
+    error result for every tool call left unanswered, so the turn can be
+    recorded instead of re-running those (possibly mutating) calls.
+    """
+
+    def __init__(self, cause: BaseException, messages: list[BaseMessage]):
+        super().__init__(f"{type(cause).__name__}: {cause}")
+        self.messages = messages
+
+
+def _close_tool_calls(messages: list[BaseMessage], error: BaseException) -> list[BaseMessage]:
+    """Append an error result for each tool call that has none."""
+    answered = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+    closed = list(messages)
+    for message in messages:
+        if isinstance(message, AIMessage):
+            for tool_call in message.tool_calls:
+                if tool_call["id"] not in answered:
+                    closed.append(ToolMessage(
+                        content=f"Error: {type(error).__name__}: {error}",
+                        tool_call_id=tool_call["id"],
+                        name=tool_call["name"],
+                        status="error",
+                    ))
+    return closed
+
+
+async def replay_plan(
+    llm: BaseChatModel,
+    tools: list[BaseTool],
+    plan: list[dict],
+    messages: list[BaseMessage],
+) -> list[BaseMessage]:
+    """Run a cached plan and return the messages it produced.
+
+    Each step binds only that step's tool and forces the model to call it,
+    so the model fills in arguments (from the goal and earlier tool results)
+    instead of re-planning against the full tool list. A last call writes the
+    answer. Failures before any tool ran are raised as-is, so callers can
+    fall back to the full agent; later ones raise ``PlanReplayError``.
+    """
+    tools_by_name = {t.name: t for t in tools}
+    new_messages: list[BaseMessage] = []
+    tool_started = False
+
+    try:
+        for step in plan:
+            tool = tools_by_name[step["name"]]
+            slot_filler = llm.bind_tools([tool], tool_choice=tool.name)
+            ai_message = await slot_filler.ainvoke(messages + new_messages)
+            if not ai_message.tool_calls:
+                raise ValueError(f"Model did not call {tool.name} while replaying plan")
+            new_messages.append(ai_message)
+            for tool_call in ai_message.tool_calls:
+                tool_started = True
+                new_messages.append(await tool.ainvoke(tool_call))
+
+        new_messages.append(await llm.ainvoke(messages + new_messages))
+    except Exception as e:
+        if tool_started:
+            raise PlanReplayError(e, _close_tool_calls(new_messages, e)) from e
+        raise
+    return new_messages
@@ -0,0 +1,283 @@
+import asyncio
+import atexit
+import functools
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Sequence
+
+from langgraph.checkpoint.base import WRITES_IDX_MAP, get_checkpoint_metadata
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+DB_PATH = "chatbot.db"
+
+# WAL lets readers run alongside the writer, and NORMAL only fsyncs at
+# checkpoints instead of on every commit
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+CHECKPOINT_QUERY = (
+    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+    "parent_checkpoint_id, type, checkpoint, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+WRITES_QUERY = (
+    "INSERT OR {action} INTO writes (thread_id, checkpoint_ns, checkpoint_id, "
+    "task_id, idx, channel, type, value) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class ThreadedSqliteSaver(SqliteSaver):
+    """SqliteSaver whose async API runs on one dedicated writer thread.
+
+    Every database call goes through a single-worker executor, which keeps
+    operations ordered without aiosqlite's per-operation queue hop. Writes
+    are batched: ``aput``/``aput_writes`` serialize their rows right away and
+    put them on a bounded queue, and a background task commits up to
+    ``batch_size`` queued statements per transaction. When the queue is full
+    callers wait, which applies back-pressure to the graph. Reads flush
+    pending writes first.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, *, maxsize: int = 64, batch_size: int = 16):
+        super().__init__(conn)
+        self.batch_size = batch_size
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._drainer: asyncio.Task | None = None
+        self._in_flight: list[tuple[str, list[tuple]]] = []
+        # Batches the executor refused at interpreter exit, left for close()
+        self._refused: list[tuple[str, list[tuple]]] = []
+        self._closed = False
+        # thread_id -> first failed commit of that thread, re-raised to the
+        # next write or read of the same thread only
+        self._write_errors: dict[str, BaseException] = {}
+
+    async def _run(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool, functools.partial(fn, *args, **kwargs)
+        )
+
+    def _write_batch(self, batch: list[tuple[str, list[tuple]]]) -> None:
+        with self.lock:
+            self.setup()
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for query, rows in batch:
+                    self.conn.executemany(query, rows)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def _list_thread_ids(self) -> list[str]:
+        # Served (already sorted) by the primary key index, which leads with thread_id
+        with self.cursor(transaction=False) as cur:
+            cur.execute("SELECT DISTINCT thread_id FROM checkpoints ORDER BY thread_id")
+            return [row[0] for row in cur.fetchall()]
+
+    def _raise_write_error(self, thread_id: str) -> None:
+        error = self._write_errors.pop(thread_id, None)
+        if error is not None:
+            raise error
+
+    async def _enqueue(self, thread_id: str, query: str, rows: list[tuple]) -> None:
+        self._raise_write_error(thread_id)
+        if self._drainer is None or self._drainer.done():
+            self.loop = asyncio.get_running_loop()
+            self._drainer = asyncio.create_task(self._drain())
+        await self._queue.put((query, rows))
+
+    async def _drain(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                future = self._pool.submit(self._write_batch, batch)
+            except RuntimeError:
+                # The executor stops taking work before atexit handlers run
+                self._refused.extend(batch)
+                for _ in batch:
+                    self._queue.task_done()
+                continue
+            self._in_flight = batch
+            try:
+                await asyncio.wrap_future(future)
+            except Exception as e:
+                if self._closed:
+                    # close() already committed this batch at interpreter exit
+                    return
+                print(f"❌ Failed to write checkpoint batch: {type(e).__name__}: {e}")
+                for _, rows in batch:
+                    for row in rows:
+                        self._write_errors.setdefault(row[0], e)
+            else:
+                self._in_flight = []
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def aflush(self, thread_id: str | None = None) -> None:
+        """Wait until every queued write is committed.
+
+        With a ``thread_id``, raises the error of a batch that failed to
+        commit rows of that thread, so a lost checkpoint stops its run like
+        it would with the unbatched saver.
+        """
+        if self._drainer is not None and not self._drainer.done():
+            await self._queue.join()
+        if thread_id is not None:
+            self._raise_write_error(thread_id)
+
+    async def aclose(self) -> None:
+        await self.aflush()
+        if self._drainer is not None:
+            self._drainer.cancel()
+        await self._run(self.conn.close)
+        self._pool.shutdown()
+
+    def close(self) -> None:
+        """Commit whatever is still queued and close, on the calling thread.
+
+        Used at interpreter exit, when the executor no longer accepts work
+        and the loop owning the queue may be stuck in a daemon thread. The
+        connection is not bound to a thread and ``self.lock`` serializes it,
+        so the pending rows are written here directly. Batches the executor
+        refused, and the last one it took if it didn't commit, are written
+        again; every statement is an ``INSERT OR REPLACE``/``OR IGNORE``, so
+        that is harmless.
+        """
+        if self._closed:
+            return
+        batch = self._refused + self._in_flight
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        self._closed = True
+        try:
+            if batch:
+                self._write_batch(batch)
+        finally:
+            with self.lock:
+                self.conn.close()
+        self._pool.shutdown(wait=False)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        configurable = config["configurable"]
+        thread_id = str(configurable["thread_id"])
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = json.dumps(
+            get_checkpoint_metadata(config, metadata), ensure_ascii=False
+        ).encode("utf-8", "ignore")
+        await self._enqueue(
+            thread_id,
+            CHECKPOINT_QUERY,
+            [(
+                thread_id,
+                configurable["checkpoint_ns"],
+                checkpoint["id"],
+                configurable.get("checkpoint_id"),
+                type_,
+                serialized_checkpoint,
+                serialized_metadata,
+            )],
+        )
+        return {
+            "configurable": {
+                "thread_id": configurable["thread_id"],
+                "checkpoint_ns": configurable["checkpoint_ns"],
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config["configurable"]
+        thread_id = str(configurable["thread_id"])
+        action = "REPLACE" if all(w[0] in WRITES_IDX_MAP for w in writes) else "IGNORE"
+        await self._enqueue(
+            thread_id,
+            WRITES_QUERY.format(action=action),
+            [
+                (
+                    thread_id,
+                    str(configurable["checkpoint_ns"]),
+                    str(configurable["checkpoint_id"]),
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    *self.serde.dumps_typed(value),
+                )
+                for idx, (channel, value) in enumerate(writes)
+            ],
+        )
+
+    async def aget_tuple(self, config):
+        await self.aflush(str(config["configurable"]["thread_id"]))
+        return await self._run(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        thread_id = config["configurable"].get("thread_id") if config else None
+        await self.aflush(None if thread_id is None else str(thread_id))
+        checkpoints = await self._run(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def alist_thread_ids(self) -> list[str]:
+        """Sorted distinct thread ids, read straight from SQL without deserializing checkpoints."""
+        await self.aflush()
+        return await self._run(self._list_thread_ids)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.aflush()
+        self._write_errors.pop(str(thread_id), None)
+        await self._run(self.delete_thread, thread_id)
+
+
+_checkpointer: ThreadedSqliteSaver | None = None
+_lock = asyncio.Lock()
+
+
+async def get_checkpointer() -> ThreadedSqliteSaver:
+    """Return the process-wide checkpointer, opening its connection once."""
+    global _checkpointer
+    async with _lock:
+        if _checkpointer is None:
+            conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            _checkpointer = ThreadedSqliteSaver(conn)
+    return _checkpointer
+
+
+async def close_checkpointer() -> None:
+    """Flush pending checkpoint writes and close the connection."""
+    global _checkpointer
+    async with _lock:
+        if _checkpointer is not None:
+            await _checkpointer.aclose()
+            _checkpointer = None
+
+
+def _close_checkpointer():
+    if _checkpointer is None:
+        return
+    try:
+        _checkpointer.close()
+    except Exception as e:
+        print(f"❌ Failed to flush checkpoints at exit: {type(e).__name__}: {e}")
+
+
+atexit.register(_close_checkpointer)
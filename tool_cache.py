@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import json
+import time
+from importlib.metadata import PackageNotFoundError, version
+
+from langchain_core.tools import BaseTool, StructuredTool
+from langchain_mcp_adapters.client import MultiServerMCPClient
+
+CACHE_PATH = ".mcp_tools_cache.json"
+CACHE_TTL = 24 * 60 * 60  # seconds
+
+
+def _cache_version(client: MultiServerMCPClient) -> str:
+    """Changes whenever the server config or the adapter version does."""
+    try:
+        adapter_version = version("langchain-mcp-adapters")
+    except PackageNotFoundError:
+        adapter_version = "unknown"
+    payload = json.dumps(
+        {"connections": client.connections, "adapter": adapter_version},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _tool_spec(tool: BaseTool) -> dict:
+    schema = tool.args_schema
+    if schema is not None and not isinstance(schema, dict):
+        schema = schema.model_json_schema()
+    return {
+        "name": tool.name,
+        "description": tool.description,
+        "args_schema": schema or {"type": "object", "properties": {}},
+        "response_format": tool.response_format,
+    }
+
+
+def _read_cache(cache_version: str) -> list[dict] | None:
+    try:
+        with open(CACHE_PATH, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    tools = data.get("tools")
+    if (
+        data.get("version") != cache_version
+        or time.time() - data.get("created_at", 0) > CACHE_TTL
+        or not tools
+        or data.get("hash") != hashlib.sha256(json.dumps(tools, sort_keys=True).encode()).hexdigest()
+    ):
+        return None
+    return tools
+
+
+def _write_cache(cache_version: str, tools: list[BaseTool]) -> None:
+    specs = [_tool_spec(t) for t in tools]
+    data = {
+        "version": cache_version,
+        "created_at": time.time(),
+        "hash": hashlib.sha256(json.dumps(specs, sort_keys=True).encode()).hexdigest(),
+        "tools": specs,
+    }
+    try:
+        with open(CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    except OSError as e:
+        print(f"⚠️  Could not write MCP tool cache: {e}")
+
+
+class _LiveTools:
+    """Real MCP tools, loaded from the server on the first tool call."""
+
+    def __init__(self, client: MultiServerMCPClient):
+        self.client = client
+        self._tools: dict[str, BaseTool] | None = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, name: str) -> BaseTool:
+        async with self._lock:
+            if self._tools is None:
+                self._tools = {t.name: t for t in await self.client.get_tools()}
+        return self._tools[name]
+
+
+def _stub_tool(spec: dict, live: _LiveTools) -> BaseTool:
+    name = spec["name"]
+
+    async def call_tool(**arguments):
+        real = await live.get(name)
+        return await real.coroutine(**arguments)
+
+    return StructuredTool(
+        name=name,
+        description=spec["description"],
+        args_schema=spec["args_schema"],
+        coroutine=call_tool,
+        response_format=spec["response_format"],
+    )
+
+
+async def load_tools(client: MultiServerMCPClient) -> list[BaseTool]:
+    """Return the client's tools, using the on-disk schema cache when fresh.
+
+    On a cache hit no MCP server is started; the returned tools connect to
+    the server on their first call. On a miss the tools are loaded from the
+    server and their schemas are written to ``CACHE_PATH``.
+    """
+    cache_version = _cache_version(client)
+    specs = _read_cache(cache_version)
+    if specs is not None:
+        live = _LiveTools(client)
+        return [_stub_tool(spec, live) for spec in specs]
+
+    tools = await client.get_tools()
+    if tools:
+        _write_cache(cache_version, tools)
+    return tools